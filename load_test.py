@@ -0,0 +1,500 @@
+"""
+Harness de pruebas de carga concurrentes para el viewer (app.py).
+
+Simula N sesiones simultáneas que presionan "📁 Cargar Proyecto" sobre caches
+JSON sintéticos de distintos tamaños y reporta:
+
+- Latencia por click (p50 / p90 / p99 / máx).
+- Memoria pico: suma del RSS máximo de los procesos que ejecutan las sesiones,
+  medida por escenario (cada escenario arranca procesos nuevos).
+- Correctitud: cada sesión debe recibir el grafo de SU proyecto. Como
+  `create_network_graph` escribe siempre en `gcp_network.html`, sesiones
+  concurrentes pueden leer el HTML de otra sesión o encontrarse el archivo
+  ya borrado; ambas situaciones se cuentan como fallos de la aplicación.
+- Timeouts: clicks que superan `--timeout` (o que siguen en curso al vencer
+  el deadline del escenario). Son lentitud de la aplicación, no del harness.
+- Errores del propio harness, reportados aparte y sin sumar latencias.
+
+Backends:
+- `direct` (por defecto): stand-in local que importa app.py y repite el camino
+  del botón (`load_data_from_cache` + `create_network_graph` + lectura/borrado
+  del HTML) sin el runtime de Streamlit, con un hilo por sesión dentro de un
+  proceso por escenario, como el servidor de Streamlit. Las sesiones compiten
+  por el GIL, así que latencia y memoria crecen con `--sessions`.
+- `apptest`: ejecuta app.py completo con `streamlit.testing.v1.AppTest` en un
+  proceso por sesión (AppTest modifica estado global y no es seguro entre
+  hilos). La latencia NO incluye la contención por el GIL del servidor real y
+  la memoria es la suma de procesos independientes (cada uno con su propio
+  Streamlit cargado). Sirve para validar el script completo, no para medir
+  límites de escala. Los clicks repetidos reutilizan la misma instancia y su
+  session_state.
+
+Uso:
+    python load_test.py --sessions 8 --sizes small,medium,large
+    python load_test.py --backend apptest --sessions 4 --iterations 3
+
+Código de salida: 1 si alguna sesión recibió un grafo incorrecto, la app falló
+o hubo timeouts; 2 si solo hubo errores del harness; 0 si todo salió bien.
+Sirve como chequeo antes de desplegar.
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from queue import Empty
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(APP_DIR, "app.py")
+
+# Tamaños de cache sintético: (categorías, detalles por categoría, tablas por detalle)
+CACHE_SIZES = {
+    "small": (4, 5, 3),      # ~85 nodos
+    "medium": (6, 15, 8),    # ~820 nodos
+    "large": (6, 20, 10),    # ~1300 nodos (~2.5x el tiempo de medium por click)
+}
+
+# --- Generación de caches sintéticos ---
+
+def build_synthetic_graph(project_id, categories, details, tables):
+    """Construye un grafo con la misma estructura de niveles que genera app_download.py."""
+    nodes = [{
+        "id": project_id,
+        "label": project_id,
+        "group": "Project",
+        "size": 30,
+        "color": "#1F77B4",
+        "level": 0,
+        "title": f"Proyecto: {project_id}"
+    }]
+    edges = []
+
+    for c in range(categories):
+        category_id = f"{project_id}_category_{c}"
+        nodes.append({
+            "id": category_id,
+            "label": f"📦 Categoría {c}",
+            "group": "Category",
+            "size": 25,
+            "color": "#FF7F0E",
+            "level": 1
+        })
+        edges.append({"source": project_id, "target": category_id, "label": "contiene"})
+
+        for d in range(details):
+            detail_id = f"{category_id}_detail_{d}"
+            nodes.append({
+                "id": detail_id,
+                "label": f"Recurso {c}.{d}",
+                "group": "Dataset",
+                "size": 20,
+                "color": "#2CA02C",
+                "level": 2
+            })
+            edges.append({"source": category_id, "target": detail_id, "label": "dataset"})
+
+            for t in range(tables):
+                table_id = f"{detail_id}_table_{t}"
+                nodes.append({
+                    "id": table_id,
+                    "label": f"Tabla {t}",
+                    "group": "Table",
+                    "size": 10,
+                    "color": "#9467BD",
+                    "level": 3
+                })
+                edges.append({"source": detail_id, "target": table_id, "label": "tabla"})
+
+    return {"nodes": nodes, "edges": edges}
+
+def write_synthetic_caches(cache_dir, size_name, sessions):
+    """Escribe un cache por sesión y devuelve la lista de project_ids generados."""
+    categories, details, tables = CACHE_SIZES[size_name]
+    project_ids = []
+    for i in range(sessions):
+        project_id = f"loadtest-{size_name}-{i:04d}"
+        cache_data = {
+            "timestamp": time.strftime('%Y-%m-%d %H:%M:%S'),
+            "project_id": project_id,
+            "data": build_synthetic_graph(project_id, categories, details, tables),
+            "generated_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "version": "1.0"
+        }
+        cache_file = os.path.join(cache_dir, f"{project_id}_gcp_data.json")
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump(cache_data, f, ensure_ascii=False)
+        project_ids.append(project_id)
+    return project_ids
+
+# --- Verificación de correctitud ---
+
+def check_graph_html(html_content, project_id, all_project_ids):
+    """Devuelve None si el HTML corresponde al proyecto, o un mensaje de error."""
+    if not html_content:
+        return "HTML vacío"
+    # pyvis serializa los nodos con json.dumps, por lo que el id aparece como `"id": "<project>"`
+    if f'"id": "{project_id}"' not in html_content:
+        others = [p for p in all_project_ids if p != project_id and f'"id": "{p}"' in html_content]
+        if others:
+            return f"recibió el grafo de '{others[0]}'"
+        return "el HTML no contiene el nodo del proyecto"
+    return None
+
+# --- Backends de sesión ---
+#
+# Cada sesión publica eventos en la cola del escenario a medida que avanza, para que
+# los clicks completados sobrevivan aunque el proceso se corte por el deadline:
+#   ("ready", project_id, pid, rss_mb)                  -> pasó la barrera de inicio
+#   ("click", project_id, pid, rss_mb, latencia, error) -> error None si recibió su grafo
+#   ("done", project_id, pid, rss_mb, error_harness)    -> fin de la sesión
+# Los fallos de la aplicación viajan en "click"; solo las excepciones del propio
+# harness (o de AppTest) terminan como error_harness en "done".
+
+def publish(queue, kind, project_id, *payload):
+    """Publica un evento de sesión con el pid y el RSS pico actual del proceso."""
+    queue.put((kind, project_id, os.getpid(), max_rss_mb()) + payload)
+
+def check_apptest_result(at, project_id, all_project_ids):
+    """Verifica el resultado de un rerun de AppTest; devuelve None o un mensaje de error."""
+    if at.exception:
+        return f"excepción: {at.exception[0].message}"
+    errors = [e.value for e in at.error]
+    if errors:
+        return f"error en la UI: {errors[0]}"
+
+    # components.html se renderiza como un elemento 'iframe' con el HTML en srcdoc
+    iframes = at.get("iframe")
+    if not iframes:
+        return "no se renderizó el diagrama"
+    return check_graph_html(iframes[0].proto.srcdoc, project_id, all_project_ids)
+
+def run_session_apptest(project_id, all_project_ids, iterations, timeout, barrier, queue):
+    """Simula una sesión con AppTest: escribe el proyecto y presiona 'Cargar Proyecto' `iterations` veces."""
+    from streamlit.testing.v1 import AppTest
+
+    # Una sola instancia por sesión: los clicks repetidos comparten session_state.
+    # El timeout de AppTest cubre todo el escenario; los clicks lentos se miden y se
+    # clasifican como timeout en el reporte en lugar de cortarse como error de harness.
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout * (iterations + 1))
+    at.run()
+    at.text_input[0].set_value(project_id)
+
+    # Todas las sesiones hacen el primer click juntas para maximizar la concurrencia
+    barrier.wait(timeout)
+    publish(queue, "ready", project_id)
+    for _ in range(iterations):
+        start = time.perf_counter()
+        at.button[0].click().run()
+        elapsed = time.perf_counter() - start
+        publish(queue, "click", project_id, elapsed, check_apptest_result(at, project_id, all_project_ids))
+
+def click_direct(app, project_id, all_project_ids):
+    """Repite el camino del botón 'Cargar Proyecto' llamando directamente a las funciones de app.py."""
+    graph_data, timestamp = app.load_data_from_cache(project_id)
+    if not graph_data:
+        return f"cache no cargado: {timestamp}"
+
+    html_file_path = app.create_network_graph(graph_data)
+    if not html_file_path:
+        return "create_network_graph no generó el HTML"
+
+    html_content = None
+    try:
+        with open(html_file_path, 'r', encoding='utf-8') as f:
+            html_content = f.read()
+    except FileNotFoundError:
+        return "archivo de visualización borrado por otra sesión"
+    finally:
+        if os.path.exists(html_file_path):
+            try:
+                os.remove(html_file_path)
+            except FileNotFoundError:
+                pass
+    return check_graph_html(html_content, project_id, all_project_ids)
+
+def run_session_direct(app, project_id, all_project_ids, iterations, barrier, queue):
+    """Sesión del backend `direct`: `iterations` clicks consecutivos sobre el mismo proyecto."""
+    barrier.wait()
+    publish(queue, "ready", project_id)
+    for _ in range(iterations):
+        start = time.perf_counter()
+        try:
+            error = click_direct(app, project_id, all_project_ids)
+        except Exception as e:
+            # Una excepción dentro de app.py es un fallo de la aplicación, no del harness
+            error = f"excepción: {type(e).__name__}: {e}"
+        publish(queue, "click", project_id, time.perf_counter() - start, error)
+
+# --- Procesos de trabajo ---
+#
+# Se usa el contexto "spawn" para que cada proceso arranque limpio: AppTest reemplaza
+# estado global (Runtime, config, st.secrets) y no puede correr en varios hilos a la vez,
+# y ru_maxrss solo es comparable entre escenarios si cada uno empieza en un proceso nuevo.
+# Todos los procesos heredan el cwd, así que la colisión en gcp_network.html se sigue ejerciendo.
+
+def silence_output():
+    """Descarta stdout/stderr del proceso de trabajo (prints de debug de app.py y warnings de Streamlit).
+
+    Se llama antes de importar streamlit para que sus handlers de logging también
+    queden apuntando a /dev/null.
+    """
+    devnull = open(os.devnull, 'w', encoding='utf-8')
+    sys.stdout = devnull
+    sys.stderr = devnull
+
+def apptest_session_worker(project_id, all_project_ids, iterations, timeout, barrier, queue, verbose):
+    """Proceso de una sesión AppTest."""
+    if not verbose:
+        silence_output()
+    harness_error = None
+    try:
+        run_session_apptest(project_id, all_project_ids, iterations, timeout, barrier, queue)
+    except Exception as e:
+        harness_error = f"{type(e).__name__}: {e}"
+        # Liberar al resto de las sesiones si esta falló antes de llegar a la barrera
+        barrier.abort()
+    publish(queue, "done", project_id, harness_error)
+
+def direct_scenario_worker(project_ids, iterations, queue, verbose):
+    """Proceso de un escenario `direct`: todas las sesiones como hilos, como en el servidor de Streamlit."""
+    if not verbose:
+        silence_output()
+    try:
+        import app  # Se importa con cwd = directorio temporal para que CACHE_DIR="./" apunte ahí
+    except Exception as e:
+        for project_id in project_ids:
+            publish(queue, "done", project_id, f"{type(e).__name__}: {e}")
+        return
+
+    barrier = threading.Barrier(len(project_ids))
+
+    def session(project_id):
+        harness_error = None
+        try:
+            run_session_direct(app, project_id, project_ids, iterations, barrier, queue)
+        except Exception as e:
+            harness_error = f"{type(e).__name__}: {e}"
+            barrier.abort()
+        # Cada sesión publica su cierre al terminar, sin esperar al resto
+        publish(queue, "done", project_id, harness_error)
+
+    with ThreadPoolExecutor(max_workers=len(project_ids)) as executor:
+        list(executor.map(session, project_ids))
+
+# --- Métricas ---
+
+# Resultado del click que seguía en curso cuando venció el deadline del escenario
+CUT_BY_DEADLINE = "cortado por el deadline"
+
+def percentile(values, pct):
+    """Percentil por rango más cercano (no requiere numpy)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+def max_rss_mb():
+    """RSS máximo del proceso actual en MB (ru_maxrss está en KB en Linux y en bytes en macOS)."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+def collect_events(processes, queue, project_ids, iterations, deadline):
+    """Recoge los eventos de las sesiones hasta que todas terminen o venza el deadline.
+
+    Devuelve un dict por project_id con los clicks completados y el estado de la sesión.
+    Un click en curso al vencer el deadline se registra con la latencia transcurrida
+    hasta ese momento (cota inferior) y CUT_BY_DEADLINE, para que cuente como timeout.
+    """
+    sessions = {pid: {"clicks": [], "ready": False, "done": False, "harness_error": None,
+                      "last_event": None}
+                for pid in project_ids}
+    rss_by_pid = {}
+
+    def handle(event):
+        kind, project_id, os_pid, rss = event[:4]
+        rss_by_pid[os_pid] = max(rss_by_pid.get(os_pid, 0.0), rss)
+        session = sessions[project_id]
+        session["last_event"] = time.monotonic()
+        if kind == "ready":
+            session["ready"] = True
+        elif kind == "click":
+            elapsed, error = event[4:]
+            session["clicks"].append((elapsed, error))
+        elif kind == "done":
+            session["done"] = True
+            session["harness_error"] = event[4]
+
+    while not all(s["done"] for s in sessions.values()):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            handle(queue.get(timeout=min(remaining, 1.0)))
+        except Empty:
+            if not any(p.is_alive() for p in processes):
+                # Procesos terminados: vaciar lo que quede en tránsito y salir
+                try:
+                    while True:
+                        handle(queue.get(timeout=1.0))
+                except Empty:
+                    break
+
+    deadline_hit = any(p.is_alive() for p in processes)
+    for p in processes:
+        p.join(timeout=1.0)
+        if p.is_alive():
+            p.terminate()
+            p.join()
+
+    now = time.monotonic()
+    for session in sessions.values():
+        if session["done"]:
+            continue
+        if deadline_hit and session["ready"] and len(session["clicks"]) < iterations:
+            # Sesión cortada por el deadline en medio de un click: es lentitud de la app
+            session["clicks"].append((now - session["last_event"], CUT_BY_DEADLINE))
+        else:
+            session["harness_error"] = ("no llegó a iniciar los clicks antes del deadline"
+                                        if deadline_hit else
+                                        "el proceso terminó sin reportar resultados")
+    return sessions, sum(rss_by_pid.values())
+
+def run_scenario(size_name, sessions, iterations, backend, timeout, cache_dir, verbose):
+    """Lanza `sessions` sesiones concurrentes con `iterations` clicks cada una y agrega resultados."""
+    project_ids = write_synthetic_caches(cache_dir, size_name, sessions)
+
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    if backend == "apptest":
+        barrier = ctx.Barrier(sessions)
+        processes = [ctx.Process(target=apptest_session_worker,
+                                 args=(pid, project_ids, iterations, timeout, barrier, queue, verbose))
+                     for pid in project_ids]
+    else:
+        processes = [ctx.Process(target=direct_scenario_worker,
+                                 args=(project_ids, iterations, queue, verbose))]
+
+    wall_start = time.perf_counter()
+    for p in processes:
+        p.start()
+    # Un timeout para el arranque (spawn + import + run inicial) y uno por click
+    deadline = time.monotonic() + timeout * (iterations + 1)
+    outcomes, rss_total = collect_events(processes, queue, project_ids, iterations, deadline)
+    wall_time = time.perf_counter() - wall_start
+
+    # Clicks que superan --timeout (o quedaron cortados) son timeouts de la aplicación;
+    # su latencia sí entra en los percentiles, que es justamente el límite que se busca medir.
+    latencies = [elapsed for o in outcomes.values() for elapsed, _ in o["clicks"]]
+    def is_timeout(elapsed, error):
+        return elapsed >= timeout or error == CUT_BY_DEADLINE
+
+    timeouts = [(pid, f"{elapsed:.1f} s" + (f" ({error})" if error == CUT_BY_DEADLINE else ""))
+                for pid, o in outcomes.items() for elapsed, error in o["clicks"]
+                if is_timeout(elapsed, error)]
+    failures = [(pid, error) for pid, o in outcomes.items()
+                for elapsed, error in o["clicks"] if error and not is_timeout(elapsed, error)]
+    harness_errors = [(pid, o["harness_error"]) for pid, o in outcomes.items() if o["harness_error"]]
+
+    categories, details, tables = CACHE_SIZES[size_name]
+    return {
+        "size": size_name,
+        "nodes": 1 + categories * (1 + details * (1 + tables)),
+        "sessions": sessions,
+        "requests": len(latencies),
+        "p50": percentile(latencies, 50),
+        "p90": percentile(latencies, 90),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies) if latencies else 0.0,
+        "wall": wall_time,
+        "rss_mb": rss_total,
+        "failures": failures,
+        "timeouts": timeouts,
+        "harness_errors": harness_errors,
+    }
+
+def print_report(results, timeout):
+    """Imprime la tabla de resultados y el detalle de fallos."""
+    header = (f"{'tamaño':<8} {'nodos':>6} {'sesiones':>8} {'reqs':>5} "
+              f"{'p50 s':>7} {'p90 s':>7} {'p99 s':>7} {'máx s':>7} "
+              f"{'RSS total MB':>12} {'fallos':>6} {'timeouts':>8} {'harness':>7}")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['size']:<8} {r['nodes']:>6} {r['sessions']:>8} {r['requests']:>5} "
+              f"{r['p50']:>7.3f} {r['p90']:>7.3f} {r['p99']:>7.3f} {r['max']:>7.3f} "
+              f"{r['rss_mb']:>12.1f} {len(r['failures']):>6} {len(r['timeouts']):>8} "
+              f"{len(r['harness_errors']):>7}")
+
+    for r in results:
+        print_errors(f"❌ Fallos de la aplicación en '{r['size']}':", r['failures'])
+        print_errors(f"🐢 Clicks que superaron {timeout:.0f} s en '{r['size']}':", r['timeouts'])
+        print_errors(f"⚠️ Errores del harness en '{r['size']}' (resultado no confiable):",
+                     r['harness_errors'])
+
+def print_errors(title, errors):
+    """Imprime hasta 10 errores (project_id, mensaje) bajo un título."""
+    if not errors:
+        return
+    print(f"\n{title}")
+    for project_id, error in errors[:10]:
+        print(f"   • {project_id}: {error}")
+    if len(errors) > 10:
+        print(f"   ... y {len(errors) - 10} más")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga concurrente del viewer GCP.")
+    parser.add_argument("--sessions", type=int, default=8, help="Sesiones concurrentes por escenario.")
+    parser.add_argument("--iterations", type=int, default=1,
+                        help="Clicks consecutivos en 'Cargar Proyecto' dentro de cada sesión (misma session_state).")
+    parser.add_argument("--sizes", default="small,medium",
+                        help=f"Tamaños de cache separados por coma ({', '.join(CACHE_SIZES)}).")
+    parser.add_argument("--backend", choices=["direct", "apptest"], default="direct",
+                        help="direct: llamadas directas a app.py, un hilo por sesión en un proceso; "
+                             "apptest: Streamlit AppTest, un proceso por sesión.")
+    parser.add_argument("--timeout", type=float, default=120.0,
+                        help="Latencia máxima aceptable por click (s); los clicks más lentos cuentan como timeout.")
+    parser.add_argument("--verbose", action="store_true",
+                        help="No descartar la salida de app.py y Streamlit en los procesos de trabajo.")
+    args = parser.parse_args(argv)
+
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    unknown = [s for s in sizes if s not in CACHE_SIZES]
+    if unknown:
+        parser.error(f"tamaños desconocidos: {', '.join(unknown)}")
+    if args.sessions < 1 or args.iterations < 1:
+        parser.error("--sessions y --iterations deben ser >= 1")
+
+    sys.path.insert(0, APP_DIR)
+    original_cwd = os.getcwd()
+    results = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="gcp_loadtest_") as cache_dir:
+            # app.py usa rutas relativas (CACHE_DIR="./" y gcp_network.html), así que
+            # se trabaja dentro del directorio temporal para no tocar los caches reales.
+            os.chdir(cache_dir)
+            for size_name in sizes:
+                print(f"🚀 Escenario '{size_name}': {args.sessions} sesiones x {args.iterations} "
+                      f"iteraciones (backend: {args.backend})", flush=True)
+                results.append(run_scenario(size_name, args.sessions, args.iterations,
+                                            args.backend, args.timeout, cache_dir, args.verbose))
+    finally:
+        os.chdir(original_cwd)
+
+    print()
+    print_report(results, args.timeout)
+    if any(r['failures'] or r['timeouts'] for r in results):
+        return 1
+    if any(r['harness_errors'] for r in results):
+        return 2
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())